@@ -1,4 +1,5 @@
 import argparse
+import functools
 import json
 import asyncio
 import sys
@@ -6,33 +7,114 @@ from .models import InstanceState, SystemState, DeploymentConfig
 from .engine import DeploymentEngine
 from .logger import setup_logging, get_logger
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib
+    orjson = None
 
-def load_instances(path):
+try:
+    import ijson
+except ImportError:  # ijson is optional, only needed for --streaming
+    ijson = None
+
+
+def _read_json(path):
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path) as f:
+        return json.load(f)
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, indent=2)
+
+
+def _write_json(path, data):
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+
+def _dumps_compact(data):
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data)
+
+
+def _stream_json_array(path, items):
+    """Write a JSON array one element per line without building the whole document"""
+    with open(path, "w") as f:
+        f.write("[")
+        for n, item in enumerate(items):
+            f.write(",\n  " if n else "\n  ")
+            f.write(_dumps_compact(item))
+        f.write("\n]\n")
+
+
+def _stream_json_object(path, pairs):
+    """Write a JSON object one member per line without building the whole document"""
+    with open(path, "w") as f:
+        f.write("{")
+        for n, (key, value) in enumerate(pairs):
+            f.write(",\n  " if n else "\n  ")
+            f.write(f"{_dumps_compact(key)}: {_dumps_compact(value)}")
+        f.write("\n}\n")
+
+
+def _instance_from_dict(i):
+    return InstanceState(
+        instance_id=i["instance_id"],
+        code_version=i["code_version"],
+        configuration_version=i["configuration_version"],
+        health=i.get("health", "healthy")
+    )
+
+
+def _instance_to_dict(i):
+    return {
+        "instance_id": i.instance_id,
+        "code_version": i.code_version,
+        "configuration_version": i.configuration_version,
+        "health": i.health,
+    }
+
+
+def load_instances(path, streaming=False):
+    """Load instances from a JSON array file
+
+    With streaming=True the file is parsed incrementally with ijson so only
+    one raw instance object is held in memory at a time.
+    """
     logger = get_logger("cli")
     try:
-        data = json.load(open(path))
-        instances = []
-        for i in data:
-            health = i.get("health", "healthy")
-            instance = InstanceState(
-                instance_id=i["instance_id"],
-                code_version=i["code_version"],
-                configuration_version=i["configuration_version"],
-                health=health
-            )
-            instances.append(instance)
-        return instances
+        if not streaming:
+            return [_instance_from_dict(i) for i in _read_json(path)]
+        if ijson is None:
+            raise RuntimeError("streaming mode requires the ijson package")
+        with open(path, "rb") as f:
+            return [_instance_from_dict(i) for i in ijson.items(f, "item")]
     except Exception as e:
-        logger.error(f"Error loading instances: {e}")
+        logger.error("Error loading instances: %s", e)
         raise
 
 
-def save_instances(path, instances):
-    from dataclasses import asdict
-    json.dump([asdict(i) for i in instances], open(path, "w"), indent=2)
+def save_instances(path, instances, streaming=False):
+    records = (_instance_to_dict(i) for i in instances)
+    if streaming:
+        _stream_json_array(path, records)
+    else:
+        _write_json(path, list(records))
 
 
-def main():
+@functools.lru_cache(maxsize=None)
+def _get_parser():
+    """Build the argument parser once and reuse it for every main() call"""
     parser = argparse.ArgumentParser(description="Deployment engine")
     parser.add_argument("--log-level", default="INFO")
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -43,43 +125,54 @@ def main():
     deploy.add_argument("--batch-size", type=int, default=5)
     deploy.add_argument("--max-failures", type=int)
     deploy.add_argument("--dry-run", action="store_true")
+    deploy.add_argument("--streaming", action="store_true", help="stream instance files (requires ijson)")
 
     rollback = sub.add_parser("rollback")
     rollback.add_argument("--snapshot", required=True)
     rollback.add_argument("--instances")
+    rollback.add_argument("--streaming", action="store_true", help="stream instance files (requires ijson)")
+    return parser
+
 
-    args = parser.parse_args()
+def main():
+    args = _get_parser().parse_args()
     setup_logging(args.log_level)
 
     if args.cmd == "deploy":
         try:
-            instances = load_instances(args.instances)
-            desired = SystemState(**json.load(open(args.desired)))
+            instances = load_instances(args.instances, args.streaming)
+            desired = SystemState(**_read_json(args.desired))
             current = SystemState(instances[0].code_version, instances[0].configuration_version)
             config = DeploymentConfig(args.batch_size, args.max_failures)
         except Exception as e:
             print(f"Error: {e}")
             sys.exit(1)
 
-        # Save snapshot
+        # Save snapshot, the engine reuses it for automatic rollback
+        snapshot = DeploymentEngine.take_snapshot(instances)
+        if args.streaming:
+            _stream_json_object(".snapshot.json", snapshot.items())
+        else:
+            _write_json(".snapshot.json", snapshot)
+
         from dataclasses import asdict
-        json.dump({i.instance_id: asdict(i) for i in instances}, open(".snapshot.json", "w"), indent=2)
 
         async def run():
-            result = await DeploymentEngine().deploy(instances, desired, current, config, args.dry_run)
-            print(json.dumps(asdict(result), indent=2))
+            result = await DeploymentEngine().deploy(instances, desired, current, config, args.dry_run, snapshot)
+            print(_dumps(asdict(result)))
             if not args.dry_run:
-                save_instances(args.instances, instances)
+                save_instances(args.instances, instances, args.streaming)
 
         asyncio.run(run())
 
     if args.cmd == "rollback":
         try:
-            snapshot = json.load(open(args.snapshot))
-            instances = load_instances(args.instances) if args.instances else load_instances("examples/instances.json")
+            snapshot = _read_json(args.snapshot)
+            instances_path = args.instances or "examples/instances.json"
+            instances = load_instances(instances_path, args.streaming)
             asyncio.run(DeploymentEngine().rollback(instances, snapshot))
             if args.instances:
-                save_instances(args.instances, instances)
+                save_instances(args.instances, instances, args.streaming)
             print("Done.")
         except Exception as e:
             print(f"Error: {e}")
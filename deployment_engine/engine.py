@@ -1,8 +1,20 @@
 import asyncio
-from .models import Health, DeploymentResult
+import sys
+from .models import Health, InstanceState, SystemState, DeploymentConfig, DeploymentResult
 from .failure import FailureInjector
 from .logger import get_logger
 
+# Python 3.12+ can start tasks eagerly, so updates that finish without
+# suspending never have to round-trip through the event loop
+if sys.version_info >= (3, 12):
+    def _start_task(coro):
+        return asyncio.Task(coro, loop=asyncio.get_running_loop(), eager_start=True)
+else:
+    _start_task = asyncio.ensure_future
+
+# Direct value -> member lookup for health strings read back from snapshots
+_HEALTH_BY_VALUE = {h.value: h for h in Health}
+
 
 class DeploymentEngine:
     def __init__(self, failure_injector=None):
@@ -10,36 +22,69 @@ class DeploymentEngine:
         self.logger = get_logger("engine")
 
     @staticmethod
-    def plan_batches(instances, batch_size):
+    def plan_batches(instances: list[InstanceState], batch_size: int) -> list[list[InstanceState]]:
         """Split instances into batches for deployment"""
         if batch_size <= 0:
             raise ValueError("batch_size must be > 0")
 
         # Convert to list if needed and create batches
         instance_list = list(instances)
-        batches = []
-        for i in range(0, len(instance_list), batch_size):
-            batch = instance_list[i:i + batch_size]
-            batches.append(batch)
-        return batches
+        return [instance_list[i:i + batch_size] for i in range(0, len(instance_list), batch_size)]
+
+    @staticmethod
+    def take_snapshot(instances):
+        """Capture (code_version, configuration_version, health) per instance for rollback"""
+        return {
+            i.instance_id: (i.code_version, i.configuration_version, i.health)
+            for i in instances
+        }
 
     async def _update_instance(self, instance, desired, config):
         """Update a single instance with retries and timeout handling"""
+        do_update = self._do_update_with_retry if config.retry_max_attempts > 0 else self._do_update_no_retry
 
         # Apply timeout if configured
         if config.timeout_s and config.timeout_s > 0:
             try:
-                return await asyncio.wait_for(self._do_update(instance, desired, config), timeout=config.timeout_s)
+                return await asyncio.wait_for(do_update(instance, desired, config), timeout=config.timeout_s)
             except asyncio.TimeoutError:
                 instance.health = Health.FAILED
-                self.logger.error(f"Update timed out for instance {instance.instance_id} after {config.timeout_s}s")
+                self.logger.error("Update timed out for instance %s after %ss", instance.instance_id, config.timeout_s)
                 return False, "timeout"
         else:
-            return await self._do_update(instance, desired, config)
+            return await do_update(instance, desired, config)
+
+    def _apply_update(self, instance, desired):
+        """Move an instance to the desired versions"""
+        instance.code_version = desired.code_version
+        instance.configuration_version = desired.configuration_version
+        instance.health = Health.HEALTHY
+        self.logger.info("Successfully updated instance %s", instance.instance_id)
+
+    async def _do_update_no_retry(self, instance, desired, config):
+        """Single attempt update used when retries are disabled"""
+        try:
+            # Add some delay to simulate real deployment work
+            delay = self.failure_injector.delay_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # Check if we should simulate a failure
+            error = "Simulated deployment failure" if self.failure_injector.should_fail(instance) else None
+        except Exception as e:
+            error = str(e)
+
+        if error is not None:
+            instance.health = Health.FAILED
+            self.logger.error("Update failed for instance %s: %s", instance.instance_id, error)
+            return False, error
 
-    async def _do_update(self, instance, desired, config):
+        self._apply_update(instance, desired)
+        return True, None
+
+    async def _do_update_with_retry(self, instance, desired, config):
         """The actual update logic with retries"""
-        max_attempts = max(1, config.retry_max_attempts + 1)  # +1 because we count initial attempt
+        max_attempts = config.retry_max_attempts + 1  # +1 because we count initial attempt
 
         for attempt in range(1, max_attempts + 1):
             try:
@@ -53,19 +98,16 @@ class DeploymentEngine:
                     raise Exception("Simulated deployment failure")
 
                 # Actually update the instance
-                instance.code_version = desired.code_version
-                instance.configuration_version = desired.configuration_version
-                instance.health = Health.HEALTHY
-                self.logger.info(f"Successfully updated instance {instance.instance_id}")
+                self._apply_update(instance, desired)
                 return True, None
 
             except Exception as e:
-                self.logger.warning(f"Update attempt {attempt} failed for {instance.instance_id}: {str(e)}")
+                self.logger.warning("Update attempt %d failed for %s: %s", attempt, instance.instance_id, e)
 
                 if attempt >= max_attempts:
                     # Final attempt failed
                     instance.health = Health.FAILED
-                    self.logger.error(f"Instance {instance.instance_id} failed after {attempt} attempts")
+                    self.logger.error("Instance %s failed after %d attempts", instance.instance_id, attempt)
                     return False, str(e)
                 else:
                     # Mark as degraded while retrying
@@ -73,91 +115,99 @@ class DeploymentEngine:
 
                     # Simple exponential backoff
                     backoff_time = min((2 ** (attempt - 1)) * config.retry_base_delay_s, 30.0)
-                    self.logger.info(f"Retrying in {backoff_time} seconds...")
+                    self.logger.info("Retrying in %s seconds...", backoff_time)
                     await asyncio.sleep(backoff_time)
 
         return False, "Max attempts exceeded"
 
     async def rollback(self, instances, snapshot):
         """Rollback instances to previous state using snapshot"""
-        self.logger.warning(f"Starting rollback for {len(instances)} instances")
+        self.logger.warning("Starting rollback for %d instances", len(instances))
 
         # Restore each instance from snapshot
         for instance in instances:
             if instance.instance_id in snapshot:
                 snap = snapshot[instance.instance_id]
-                instance.code_version = snap["code_version"]
-                instance.configuration_version = snap["configuration_version"]
-                instance.health = Health(snap["health"])
-                self.logger.debug(f"Rolled back instance {instance.instance_id}")
+                # Entries are (code_version, configuration_version, health)
+                # sequences, older snapshot files hold one dict per instance
+                if isinstance(snap, dict):
+                    code_version = snap["code_version"]
+                    configuration_version = snap["configuration_version"]
+                    health = snap["health"]
+                else:
+                    code_version, configuration_version, health = snap
+                instance.code_version = code_version
+                instance.configuration_version = configuration_version
+                if not isinstance(health, Health):
+                    health = _HEALTH_BY_VALUE.get(health) or Health(health)
+                instance.health = health
+                self.logger.debug("Rolled back instance %s", instance.instance_id)
             else:
-                self.logger.warning(f"No snapshot found for instance {instance.instance_id}")
+                self.logger.warning("No snapshot found for instance %s", instance.instance_id)
 
         self.logger.info("Rollback completed")
 
-    def _process_batch_results(self, batch, outcomes, batch_idx, result, updated, failed):
-        """Process the results from a batch deployment"""
-        batch_updated = 0
-        batch_failed = 0
-
-        for instance, (success, error) in zip(batch, outcomes):
-            # Track per-instance history
-            if instance.instance_id not in result.per_node_history:
-                result.per_node_history[instance.instance_id] = []
-
-            if success:
-                updated.append(instance.instance_id)
-                batch_updated += 1
-                result.per_node_history[instance.instance_id].append({
-                    "event": "updated",
-                    "batch": batch_idx
-                })
-            else:
-                failed.append(instance.instance_id)
-                batch_failed += 1
-                result.per_node_history[instance.instance_id].append({
-                    "event": "failed",
-                    "batch": batch_idx,
-                    "error": error
-                })
+    def _process_result(self, instance: InstanceState, outcome: tuple[bool, str | None], batch_idx: int,
+                        result: DeploymentResult, updated: list[str], failed: list[str]) -> bool:
+        """Record the outcome of a single instance update"""
+        success, error = outcome
 
-        self.logger.info(f"Batch {batch_idx} completed: {batch_updated} updated, {batch_failed} failed")
+        # Track per-instance history
+        node_history = result.per_node_history.setdefault(instance.instance_id, [])
+
+        if success:
+            updated.append(instance.instance_id)
+            node_history.append({
+                "event": "updated",
+                "batch": batch_idx
+            })
+        else:
+            failed.append(instance.instance_id)
+            node_history.append({
+                "event": "failed",
+                "batch": batch_idx,
+                "error": error
+            })
+        return success
 
-    def _check_failure_limits(self, total_instances, failed_count, config):
+    def _check_failure_limits(self, total_instances: int, failed_count: int, config: DeploymentConfig) -> bool:
         """Check if we've exceeded failure thresholds"""
         if total_instances == 0 or failed_count == 0:
             return False
 
         # Check absolute failure limit
         if config.max_failures is not None and failed_count > config.max_failures:
-            self.logger.warning(f"Exceeded max failures: {failed_count} > {config.max_failures}")
+            self.logger.warning("Exceeded max failures: %d > %d", failed_count, config.max_failures)
             return True
 
         # Check percentage failure limit
         if config.failure_percentage is not None:
             failure_rate = (failed_count / total_instances) * 100.0
             if failure_rate > config.failure_percentage:
-                self.logger.warning(f"Exceeded failure percentage: {failure_rate:.1f}% > {config.failure_percentage}%")
+                self.logger.warning("Exceeded failure percentage: %.1f%% > %s%%", failure_rate, config.failure_percentage)
                 return True
 
         return False
 
-    def _find_instances_to_update(self, instances, desired):
+    def _find_instances_to_update(self, instances: list[InstanceState],
+                                  desired: SystemState) -> tuple[list[InstanceState], list[str]]:
         """Find which instances need updates"""
         to_update = []
         already_updated = []
 
-        for instance in instances:
-            needs_code_update = instance.code_version != desired.code_version
-            needs_config_update = instance.configuration_version != desired.configuration_version
+        # Hoist loop invariants into locals, this runs once per instance
+        desired_code = desired.code_version
+        desired_config = desired.configuration_version
+        to_update_append = to_update.append
+        already_updated_append = already_updated.append
 
-            if needs_code_update or needs_config_update:
-                to_update.append(instance)
-                self.logger.debug(f"Instance {instance.instance_id} needs update")
+        for instance in instances:
+            if instance.code_version != desired_code or instance.configuration_version != desired_config:
+                to_update_append(instance)
             else:
-                already_updated.append(instance.instance_id)
+                already_updated_append(instance.instance_id)
 
-        self.logger.info(f"Found {len(to_update)} instances to update, {len(already_updated)} already up to date")
+        self.logger.info("Found %d instances to update, %d already up to date", len(to_update), len(already_updated))
         return to_update, already_updated
 
     def _handle_dry_run_or_no_updates(self, result, instances_to_update, dry_run, desired, current):
@@ -165,63 +215,107 @@ class DeploymentEngine:
         result.success = True
 
         if dry_run:
-            self.logger.info(f"DRY RUN: Would update {len(instances_to_update)} instances")
-            result.history.append({"event": "dry_run", "instances_planned": len(instances_to_update)})
+            self.logger.info("DRY RUN: Would update %d instances", len(instances_to_update))
+            result.add_history({"event": "dry_run", "instances_planned": len(instances_to_update)})
         else:
             if len(instances_to_update) == 0:
                 self.logger.info("All instances already up to date")
-                result.history.append({"event": "no_updates_needed", "count": 0})
+                result.add_history({"event": "no_updates_needed", "count": 0})
                 # Update system state since everything is current
                 current.code_version = desired.code_version
                 current.configuration_version = desired.configuration_version
 
-    async def _run_batches(self, batches, desired, config, result, instances, snapshot):
-        """Run deployment batches one by one"""
+    async def _run_batches(self, batches, total_instances, desired, config, result, instances, snapshot):
+        """Run deployment batches through a shared pool of batch_size update slots
+
+        Instances of the next batch start as soon as a slot frees up instead of
+        waiting for the slowest instance of the current batch. Failure limits are
+        checked after every instance and in-flight updates are cancelled on abort.
+        """
         updated = []
         failed = []
-
-        for batch_idx, batch in enumerate(batches, start=1):
-            self.logger.info(f"Starting batch {batch_idx}/{len(batches)} with {len(batch)} instances")
-            result.history.append({"event": "batch_start", "batch": batch_idx, "nodes": [i.instance_id for i in batch]})
-
-            # Update all instances in this batch at the same time
-            update_tasks = []
-            for instance in batch:
-                task = self._update_instance(instance, desired, config)
-                update_tasks.append(task)
-
-            # Wait for all updates in this batch to complete
-            batch_results = await asyncio.gather(*update_tasks)
-            self._process_batch_results(batch, batch_results, batch_idx, result, updated, failed)
+        slots = asyncio.Semaphore(config.batch_size)
+        started_batches = set()
+        pending = {idx: len(batch) for idx, batch in enumerate(batches, start=1)}  # instances not finished yet
+        batch_failed = dict.fromkeys(pending, 0)  # failed instances per batch
+        # With the default config there are no limits to check after each instance
+        limits_enabled = config.max_failures is not None or config.failure_percentage is not None
+
+        async def update(batch_idx, instance):
+            async with slots:
+                if result.aborted_reason:
+                    return
+                if batch_idx not in started_batches:
+                    started_batches.add(batch_idx)
+                    batch = batches[batch_idx - 1]
+                    self.logger.info("Starting batch %d/%d with %d instances", batch_idx, len(batches), len(batch))
+                    result.add_history({"event": "batch_start", "batch": batch_idx, "nodes": [i.instance_id for i in batch]})
+                outcome = await self._update_instance(instance, desired, config)
+
+            if result.aborted_reason:
+                return
+            if not self._process_result(instance, outcome, batch_idx, result, updated, failed):
+                batch_failed[batch_idx] += 1
+            pending[batch_idx] -= 1
 
             # Check if we should abort due to too many failures
-            total_instances = sum(len(b) for b in batches)
-            if self._check_failure_limits(total_instances, len(failed), config):
+            if limits_enabled and self._check_failure_limits(total_instances, len(failed), config):
                 result.aborted_reason = "failure thresholds exceeded"
-                self.logger.error(f"DEPLOYMENT ABORTED: {len(failed)}/{total_instances} instances failed")
-                result.history.append({
-                    "event": "abort",
-                    "reason": result.aborted_reason,
-                    "failed_count": len(failed),
-                    "total_count": total_instances
+                # Stop updates that are still running, backing off between
+                # retries or waiting for a slot
+                current = asyncio.current_task()
+                for task in tasks:
+                    if task is not current:
+                        task.cancel()
+                return
+
+            if pending[batch_idx] == 0:
+                batch_size = len(batches[batch_idx - 1])
+                self.logger.info("Batch %d completed: %d updated, %d failed",
+                                 batch_idx, batch_size - batch_failed[batch_idx], batch_failed[batch_idx])
+                result.add_history({
+                    "event": "batch_completed",
+                    "batch": batch_idx,
+                    "updated_so_far": len(updated),
+                    "failed_so_far": len(failed)
                 })
 
-                # Roll back all changes
-                self.logger.info("Rolling back all changes due to deployment failure")
-                await self.rollback(instances, snapshot)
-                result.rolled_back = True
-                result.updated = []
-                result.failed = failed
-                result.success = False
-                return updated, failed, True  # Deployment was aborted
-
-            result.history.append({
-                "event": "batch_completed",
-                "batch": batch_idx,
-                "updated_so_far": len(updated),
-                "failed_so_far": len(failed)
+        tasks = []
+        launch_order = ((idx, instance) for idx, batch in enumerate(batches, start=1) for instance in batch)
+        for batch_idx, instance in launch_order:
+            # Eager tasks can trip the limits while we are still launching
+            if result.aborted_reason:
+                break
+            tasks.append(_start_task(update(batch_idx, instance)))
+
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # Stop the remaining updates if one of them raised unexpectedly
+            for task in tasks:
+                task.cancel()
+        for outcome in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                raise outcome
+
+        if result.aborted_reason:
+            self.logger.error("DEPLOYMENT ABORTED: %d/%d instances failed", len(failed), total_instances)
+            result.add_history({
+                "event": "abort",
+                "reason": result.aborted_reason,
+                "failed_count": len(failed),
+                "total_count": total_instances
             })
 
+            # Roll back all changes
+            self.logger.info("Rolling back all changes due to deployment failure")
+            await self.rollback(instances, snapshot)
+            result.rolled_back = True
+            result.updated = []
+            result.failed = failed
+            result.success = False
+            return updated, failed, True  # Deployment was aborted
+
         return updated, failed, False  # No abort needed
 
     def _finish_deployment(self, result, updated, failed, desired, current):
@@ -237,19 +331,23 @@ class DeploymentEngine:
 
         # Log final status
         if result.success:
-            self.logger.info(f"SUCCESS: Deployment completed - {len(updated)} instances updated")
+            self.logger.info("SUCCESS: Deployment completed - %d instances updated", len(updated))
         else:
-            self.logger.warning(f"PARTIAL SUCCESS: {len(updated)} updated, {len(failed)} failed")
+            self.logger.warning("PARTIAL SUCCESS: %d updated, %d failed", len(updated), len(failed))
 
-    async def deploy(self, instances, desired, current, config, dry_run=False):
-        """Main deployment method - deploy updates in batches"""
+    async def deploy(self, instances, desired, current, config, dry_run=False, snapshot=None):
+        """Main deployment method - deploy updates in batches
+
+        A snapshot from take_snapshot() taken by the caller can be passed in
+        and is used for rollback instead of capturing a new one.
+        """
         # Check if deployment is already running
         if current.deployment_in_progress:
             error_msg = "deployment already in progress"
             self.logger.error(error_msg)
             raise RuntimeError(error_msg)
 
-        self.logger.info(f"Starting deployment (dry_run={dry_run})")
+        self.logger.info("Starting deployment (dry_run=%s)", dry_run)
         result = DeploymentResult(success=False)
 
         # Figure out which instances need updates
@@ -263,21 +361,19 @@ class DeploymentEngine:
 
         # Start actual deployment
         current.deployment_in_progress = True
-        self.logger.info(f"Deploying to {len(instances_to_update)} instances in batches of {config.batch_size}")
+        self.logger.info("Deploying to %d instances in batches of %d", len(instances_to_update), config.batch_size)
 
         # Save current state in case we need to rollback
-        from dataclasses import asdict
-        snapshot = {}
-        for instance in instances:
-            snapshot[instance.instance_id] = asdict(instance)
+        if snapshot is None:
+            snapshot = self.take_snapshot(instances)
 
         try:
             # Split into batches and deploy
             batches = self.plan_batches(instances_to_update, config.batch_size)
-            self.logger.info(f"Created {len(batches)} batches for deployment")
+            self.logger.info("Created %d batches for deployment", len(batches))
 
             updated, failed, was_aborted = await self._run_batches(
-                batches, desired, config, result, instances, snapshot
+                batches, len(instances_to_update), desired, config, result, instances, snapshot
             )
 
             if was_aborted:
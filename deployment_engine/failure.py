@@ -1,13 +1,23 @@
+from collections import defaultdict
+
+from .models import InstanceState
+
+
 class FailureInjector:
     def __init__(self, fail_attempts=None, delay=0):
         self.fail_map = fail_attempts or {}
         self.delay = delay
-        self.attempts = {}
+        self.attempts = defaultdict(int)
+        # Only instances that can actually fail need their attempts counted
+        self._fail_limits = {k: v for k, v in self.fail_map.items() if v > 0}
 
     def delay_seconds(self):
         return self.delay
 
-    def should_fail(self, instance):
+    def should_fail(self, instance: InstanceState) -> bool:
         id = instance.instance_id
-        self.attempts[id] = self.attempts.get(id, 0) + 1
-        return self.attempts[id] <= self.fail_map.get(id, 0)
+        if id not in self._fail_limits:
+            return False
+        attempt = self.attempts[id] + 1
+        self.attempts[id] = attempt
+        return attempt <= self._fail_limits[id]
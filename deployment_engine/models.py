@@ -19,13 +19,13 @@ class SystemState:
     configuration_version: str
     deployment_in_progress: bool = False
 
-@dataclass
+@dataclass(frozen=True)
 class DeploymentConfig:
     """Configuration for deployment behavior"""
     batch_size: int = 5  # How many instances to deploy at once
-    max_failures: int = None  # Max failed instances before abort
-    failure_percentage: float = None  # Max failure rate (0-100%) before abort
-    timeout_s: float = None  # Timeout per instance update
+    max_failures: int | None = None  # Max failed instances before abort
+    failure_percentage: float | None = None  # Max failure rate (0-100%) before abort
+    timeout_s: float | None = None  # Timeout per instance update
     retry_max_attempts: int = 0  # How many times to retry failed updates
     retry_base_delay_s: float = 0.1  # Base delay between retries
 
@@ -33,11 +33,18 @@ class DeploymentConfig:
 class DeploymentResult:
     """Results from a deployment run"""
     success: bool
-    updated: list = field(default_factory=list)  # Instance IDs that were successfully updated
-    failed: list = field(default_factory=list)  # Instance IDs that failed to update
-    skipped: list = field(default_factory=list)  # Instance IDs that were already up to date
-    aborted_reason: str = None  # Why deployment was aborted (if it was)
+    updated: list[str] = field(default_factory=list)  # Instance IDs that were successfully updated
+    failed: list[str] = field(default_factory=list)  # Instance IDs that failed to update
+    skipped: list[str] = field(default_factory=list)  # Instance IDs that were already up to date
+    aborted_reason: str | None = None  # Why deployment was aborted (if it was)
     rolled_back: bool = False  # Whether we rolled back due to failures
-    history: list = field(default_factory=list)  # Overall deployment events
-    per_node_history: dict = field(default_factory=dict)  # Per-instance events
+    history: list[dict] = field(default_factory=list)  # Overall deployment events
+    per_node_history: dict[str, list[dict]] = field(default_factory=dict)  # Per-instance events
+    history_counts: dict[str, int] = field(default_factory=dict)  # Number of history events by type
+
+    def add_history(self, entry):
+        """Append an overall deployment event and count it by type"""
+        self.history.append(entry)
+        event = entry["event"]
+        self.history_counts[event] = self.history_counts.get(event, 0) + 1
 
@@ -0,0 +1,99 @@
+import asyncio
+from copy import copy
+import pytest
+import pytest_asyncio
+from deployment_engine.engine import DeploymentEngine
+from deployment_engine.models import DeploymentConfig, InstanceState
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional, fall back to the stdlib loop
+    uvloop = None
+
+_INSTANCE_TEMPLATE = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(32)]
+
+
+class VirtualClock:
+    """Event loop clock that jumps straight to the next scheduled timer."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+
+def pytest_asyncio_loop_factories(config, item):
+    """Run async tests on the stdlib loop and, when installed, on uvloop too.
+
+    Tests using ``virtual_clock`` only run on the stdlib loop, since the
+    fixture patches its selector.
+    """
+    factories = {"asyncio": asyncio.new_event_loop}
+    if uvloop is not None and "virtual_clock" not in item.fixturenames:
+        factories["uvloop"] = uvloop.new_event_loop
+    return factories
+
+
+@pytest.fixture(scope="session")
+def plain_engine():
+    """Engine without injected failures, shared by tests that never fail an update."""
+    return DeploymentEngine()
+
+
+@pytest.fixture(scope="session")
+def cfg_batch1_nofail():
+    """Abort on the first failure, one instance at a time.
+
+    DeploymentConfig is frozen, so a single instance is shared across tests.
+    """
+    return DeploymentConfig(batch_size=1, max_failures=0, retry_max_attempts=0)
+
+
+@pytest.fixture(scope="session")
+def cfg_batch2_nofail():
+    """Abort on the first failure, two instances at a time."""
+    return DeploymentConfig(batch_size=2, max_failures=0, retry_max_attempts=0)
+
+
+@pytest.fixture(scope="session")
+def cfg_batch2_max1():
+    """Tolerate a single failure, two instances at a time."""
+    return DeploymentConfig(batch_size=2, max_failures=1, retry_max_attempts=0)
+
+
+@pytest.fixture
+def make_instances():
+    """Return a factory for fresh id0..idN instances at oldC/oldK.
+
+    Deployments mutate instances, so each call hands out shallow copies of
+    a prebuilt template rather than the template objects themselves.
+    """
+    def make(n):
+        assert n <= len(_INSTANCE_TEMPLATE), f"make_instances supports up to {len(_INSTANCE_TEMPLATE)} instances"
+        return [copy(instance) for instance in _INSTANCE_TEMPLATE[:n]]
+    return make
+
+
+@pytest_asyncio.fixture
+async def virtual_clock(monkeypatch):
+    """Run the test's event loop on virtual time.
+
+    Sleeps, retry backoffs and timeouts complete instantly in wall-clock
+    terms while keeping their relative ordering; read elapsed time from
+    ``virtual_clock.time()``.
+    """
+    loop = asyncio.get_running_loop()
+    clock = VirtualClock()
+    real_select = loop._selector.select
+
+    def select(timeout=None):
+        # Poll instead of blocking, then advance to the next timer if idle
+        events = real_select(0 if timeout else timeout)
+        if not events and timeout:
+            clock.now += timeout
+        return events
+
+    monkeypatch.setattr(loop, "time", clock.time)
+    monkeypatch.setattr(loop._selector, "select", select)
+    return clock
@@ -1,4 +1,3 @@
-import asyncio
 import pytest
 from deployment_engine.models import InstanceState, SystemState, DeploymentConfig, Health
 from deployment_engine.engine import DeploymentEngine
@@ -104,4 +103,5 @@ class TestAdvancedScenarios:
         assert result_dict["updated"] == ["id0"]
         assert result_dict["failed"] == []
         assert "history" in result_dict
-        assert "per_node_history" in result_dict
\ No newline at end of file
+        assert "per_node_history" in result_dict
+        assert result_dict["history_counts"] == {"batch_start": 1, "batch_completed": 1}
\ No newline at end of file
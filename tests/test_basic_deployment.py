@@ -1,4 +1,3 @@
-import asyncio
 import pytest
 from deployment_engine.models import InstanceState, SystemState, DeploymentConfig, Health
 from deployment_engine.engine import DeploymentEngine
@@ -9,14 +8,13 @@ class TestBasicDeployment:
     """Basic deployment functionality tests."""
 
     @pytest.mark.asyncio
-    async def test_deploy_all_success(self):
+    async def test_deploy_all_success(self, cfg_batch2_nofail):
         instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(5)]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
-        cfg = DeploymentConfig(batch_size=2, max_failures=0, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts={}, delay=0.0))
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch2_nofail)
         assert res.success is True
         assert set(res.updated) == {i.instance_id for i in instances}
         assert res.failed == []
@@ -28,16 +26,15 @@ class TestBasicDeployment:
         assert current.configuration_version == "newK"
 
     @pytest.mark.asyncio
-    async def test_abort_and_rollback_on_failures(self):
+    async def test_abort_and_rollback_on_failures(self, cfg_batch2_max1):
         instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(5)]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         # Make two specific nodes fail on first attempt (no retries)
         fail_map = {"id1": 1, "id3": 1}
-        cfg = DeploymentConfig(batch_size=2, max_failures=1, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch2_max1)
         assert res.success is False
         assert res.rolled_back is True
         assert res.aborted_reason == "failure thresholds exceeded"
@@ -76,12 +73,11 @@ class TestBasicDeployment:
         assert instances[0].health == Health.HEALTHY
 
     @pytest.mark.asyncio
-    async def test_deployment_in_progress_with_runtime_error(self):
+    async def test_deployment_in_progress_with_runtime_error(self, cfg_batch1_nofail):
         instances = [InstanceState("id0", "oldC", "oldK")]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK", deployment_in_progress=True)
         engine = DeploymentEngine(FailureInjector(fail_attempts={}, delay=0.0))
-        cfg = DeploymentConfig(batch_size=1, max_failures=0, retry_max_attempts=0)
         # Expect RuntimeError due to deployment already in progress
         with pytest.raises(RuntimeError, match="deployment already in progress"):
-            await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
\ No newline at end of file
+            await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch1_nofail)
\ No newline at end of file
@@ -1,115 +1,129 @@
+import io
 import json
-import tempfile
 import os
 import pytest
 from unittest.mock import patch
-from deployment_engine.cli import load_instances, save_instances
+from deployment_engine.cli import load_instances, save_instances, main
 from deployment_engine.models import InstanceState, Health
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib
+    orjson = None
 
+
+def write_json(path, data):
+    """Write test input with orjson when it is installed."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data))
+    else:
+        path.write_text(json.dumps(data))
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    """Path for a per-test JSON file inside pytest's temporary directory."""
+    return tmp_path / "inst.json"
+
+
+@pytest.fixture
+def json_file_with(json_file):
+    """Factory writing the given data to the per-test JSON file and returning its path."""
+    def _write(data):
+        write_json(json_file, data)
+        return str(json_file)
+    return _write
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def json_backend(request, monkeypatch):
+    """Run a test against both the orjson and the stdlib json code paths of the CLI."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr("deployment_engine.cli.orjson", None)
+    return request.param
+
+
+@pytest.mark.usefixtures("json_backend")
 class TestCLIFileOperations:
     """Test CLI file loading and saving operations with real files."""
 
-    def test_load_instances_valid_json(self):
-        """Test loading instances from valid JSON file."""
-        test_data = [
+    @pytest.mark.parametrize("data, expected_healths", [
+        # Explicit health values
+        ([
             {"instance_id": "id1", "code_version": "v1", "configuration_version": "c1", "health": "healthy"},
             {"instance_id": "id2", "code_version": "v1", "configuration_version": "c1", "health": "degraded"}
-        ]
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(test_data, f)
-            temp_path = f.name
-
-        try:
-            instances = load_instances(temp_path)
-            assert len(instances) == 2
-            assert instances[0].instance_id == "id1"
-            assert instances[0].health == Health.HEALTHY
-            assert instances[1].health == Health.DEGRADED
-        finally:
-            os.unlink(temp_path)
-
-    def test_load_instances_missing_health_defaults_to_healthy(self):
-        """Test loading instances with missing health field defaults to healthy."""
-        test_data = [
+        ], [Health.HEALTHY, Health.DEGRADED]),
+        # Missing health field defaults to healthy
+        ([
             {"instance_id": "id1", "code_version": "v1", "configuration_version": "c1"}
-        ]
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(test_data, f)
-            temp_path = f.name
-
-        try:
-            instances = load_instances(temp_path)
-            assert len(instances) == 1
-            assert instances[0].health == Health.HEALTHY
-        finally:
-            os.unlink(temp_path)
-
-    def test_save_and_load_instances_roundtrip(self):
+        ], [Health.HEALTHY]),
+        # All possible health states
+        ([
+            {"instance_id": "healthy", "code_version": "v1", "configuration_version": "c1", "health": "healthy"},
+            {"instance_id": "degraded", "code_version": "v1", "configuration_version": "c1", "health": "degraded"},
+            {"instance_id": "failed", "code_version": "v1", "configuration_version": "c1", "health": "failed"}
+        ], [Health.HEALTHY, Health.DEGRADED, Health.FAILED]),
+    ])
+    def test_load_instances_health(self, json_file_with, data, expected_healths):
+        """Test loading instances from valid JSON preserves ids and health."""
+        instances = load_instances(json_file_with(data))
+        assert [i.instance_id for i in instances] == [d["instance_id"] for d in data]
+        assert [i.health for i in instances] == expected_healths
+
+    def test_save_and_load_instances_roundtrip(self, json_file):
         """Test saving and loading instances maintains data integrity."""
         instances = [
             InstanceState("id1", "v1", "c1", Health.HEALTHY),
             InstanceState("id2", "v1", "c1", Health.FAILED)
         ]
 
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            temp_path = f.name
+        # Save instances
+        save_instances(str(json_file), instances)
 
-        try:
-            # Save instances
-            save_instances(temp_path, instances)
+        # Load them back
+        loaded_instances = load_instances(str(json_file))
 
-            # Load them back
-            loaded_instances = load_instances(temp_path)
+        # Verify data integrity
+        assert len(loaded_instances) == 2
+        assert loaded_instances[0].instance_id == "id1"
+        assert loaded_instances[0].health == Health.HEALTHY
+        assert loaded_instances[1].instance_id == "id2"
+        assert loaded_instances[1].health == Health.FAILED
 
-            # Verify data integrity
-            assert len(loaded_instances) == 2
-            assert loaded_instances[0].instance_id == "id1"
-            assert loaded_instances[0].health == Health.HEALTHY
-            assert loaded_instances[1].instance_id == "id2"
-            assert loaded_instances[1].health == Health.FAILED
-        finally:
-            os.unlink(temp_path)
+    def test_save_and_load_instances_streaming_roundtrip(self, json_file):
+        """Test streaming save/load produces the same instances as the regular path."""
+        instances = [
+            InstanceState("id1", "v1", "c1", Health.HEALTHY),
+            InstanceState("id2", "v2", "c2", Health.DEGRADED)
+        ]
+
+        save_instances(str(json_file), instances, streaming=True)
+        assert len(json.loads(json_file.read_text())) == 2  # still a regular JSON array
+
+        loaded_instances = load_instances(str(json_file), streaming=True)
+        assert loaded_instances == load_instances(str(json_file))
+        assert loaded_instances[1].code_version == "v2"
+        assert loaded_instances[1].health == Health.DEGRADED
 
     def test_load_instances_file_not_found(self):
         """Test loading instances from non-existent file raises FileNotFoundError."""
         with pytest.raises(FileNotFoundError):
             load_instances("non_existent_file.json")
 
-    def test_load_instances_invalid_json(self):
+    def test_load_instances_invalid_json(self, monkeypatch):
         """Test loading instances from invalid JSON raises JSONDecodeError."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            f.write("invalid json content")
-            temp_path = f.name
-
-        try:
-            with pytest.raises(json.JSONDecodeError):
-                load_instances(temp_path)
-        finally:
-            os.unlink(temp_path)
-
-    def test_load_instances_with_all_health_states(self):
-        """Test loading instances with all possible health states."""
-        test_data = [
-            {"instance_id": "healthy", "code_version": "v1", "configuration_version": "c1", "health": "healthy"},
-            {"instance_id": "degraded", "code_version": "v1", "configuration_version": "c1", "health": "degraded"},
-            {"instance_id": "failed", "code_version": "v1", "configuration_version": "c1", "health": "failed"}
-        ]
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(test_data, f)
-            temp_path = f.name
+        content = "invalid json content"
+        # Shadow open() in the cli module only; binary mode is used with orjson
+        monkeypatch.setattr(
+            "deployment_engine.cli.open",
+            lambda path, mode="r", **kw: io.BytesIO(content.encode()) if "b" in mode else io.StringIO(content),
+            raising=False,
+        )
 
-        try:
-            instances = load_instances(temp_path)
-            assert len(instances) == 3
-            assert instances[0].health == Health.HEALTHY
-            assert instances[1].health == Health.DEGRADED
-            assert instances[2].health == Health.FAILED
-        finally:
-            os.unlink(temp_path)
+        with pytest.raises(json.JSONDecodeError):
+            load_instances("dummy.json")
 
 
 class TestCLIArgumentParsing:
@@ -119,7 +133,6 @@ class TestCLIArgumentParsing:
         """Test that help command exits cleanly."""
         with patch('sys.argv', ['deployment-engine', '--help']):
             with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
                 main()
             assert exc_info.value.code == 0
 
@@ -127,7 +140,6 @@ class TestCLIArgumentParsing:
         """Test that deploy help command exits cleanly."""
         with patch('sys.argv', ['deployment-engine', 'deploy', '--help']):
             with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
                 main()
             assert exc_info.value.code == 0
 
@@ -135,7 +147,6 @@ class TestCLIArgumentParsing:
         """Test that rollback help command exits cleanly."""
         with patch('sys.argv', ['deployment-engine', 'rollback', '--help']):
             with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
                 main()
             assert exc_info.value.code == 0
 
@@ -143,88 +154,60 @@ class TestCLIArgumentParsing:
         """Test CLI fails when no command is provided."""
         with patch('sys.argv', ['deployment-engine']):
             with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
                 main()
             assert exc_info.value.code != 0
 
-    def test_missing_required_arguments_fails(self):
-        """Test CLI fails when required arguments are missing."""
+    @pytest.mark.parametrize("argv", [
         # Missing both instances and desired
-        with patch('sys.argv', ['deployment-engine', 'deploy']):
-            with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
-                main()
-            assert exc_info.value.code != 0
-
+        ['deployment-engine', 'deploy'],
         # Missing desired argument
-        with patch('sys.argv', ['deployment-engine', 'deploy', '--instances', 'instances.json']):
-            with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
-                main()
-            assert exc_info.value.code != 0
-
+        ['deployment-engine', 'deploy', '--instances', 'instances.json'],
         # Missing snapshot argument for rollback
-        with patch('sys.argv', ['deployment-engine', 'rollback']):
-            with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
-                main()
-            assert exc_info.value.code != 0
-
-    def test_invalid_argument_values_fail(self):
-        """Test CLI fails with invalid argument values."""
+        ['deployment-engine', 'rollback'],
         # Invalid log level
-        with patch('sys.argv', ['deployment-engine', '--log-level', 'INVALID', 'deploy', '--instances', 'i.json', '--desired', 'd.json']):
-            with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
-                main()
-            assert exc_info.value.code != 0
-
+        ['deployment-engine', '--log-level', 'INVALID', 'deploy', '--instances', 'i.json', '--desired', 'd.json'],
         # Invalid batch size (non-integer)
-        with patch('sys.argv', ['deployment-engine', 'deploy', '--instances', 'i.json', '--desired', 'd.json', '--batch-size', 'invalid']):
-            with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
-                main()
-            assert exc_info.value.code != 0
-
+        ['deployment-engine', 'deploy', '--instances', 'i.json', '--desired', 'd.json', '--batch-size', 'invalid'],
         # Invalid max-failures (non-integer)
-        with patch('sys.argv', ['deployment-engine', 'deploy', '--instances', 'i.json', '--desired', 'd.json', '--max-failures', 'invalid']):
+        ['deployment-engine', 'deploy', '--instances', 'i.json', '--desired', 'd.json', '--max-failures', 'invalid'],
+    ])
+    def test_missing_or_invalid_arguments_fail(self, argv):
+        """Test CLI fails when required arguments are missing or values are invalid."""
+        with patch('sys.argv', argv):
             with pytest.raises(SystemExit) as exc_info:
-                from deployment_engine.cli import main
                 main()
             assert exc_info.value.code != 0
 
 
+@pytest.fixture(scope="session")
+def example_files():
+    """Paths to the bundled example files, skipping when they are absent."""
+    instances, desired = "examples/instances.json", "examples/desired.json"
+    if not (os.path.exists(instances) and os.path.exists(desired)):
+        pytest.skip("Example files not found")
+    return instances, desired
+
+
+@pytest.mark.usefixtures("json_backend")
 class TestCLIIntegration:
     """Integration tests for CLI with real example files."""
 
-    def test_cli_with_example_files_dry_run(self):
+    def test_cli_with_example_files_dry_run(self, example_files):
         """Test CLI works with actual example files in dry-run mode."""
-        # This test uses the actual example files that should exist
-        example_instances = "examples/instances.json"
-        example_desired = "examples/desired.json"
-
-        # Only run if example files exist
-        if os.path.exists(example_instances) and os.path.exists(example_desired):
-            with patch('sys.argv', [
-                'deployment-engine', 'deploy',
-                '--instances', example_instances,
-                '--desired', example_desired,
-                '--dry-run'
-            ]):
-                # Should not raise any exceptions for dry run
-                from deployment_engine.cli import main
-                main()
-        else:
-            pytest.skip("Example files not found")
-
-    def test_load_actual_example_instances(self):
+        example_instances, example_desired = example_files
+        with patch('sys.argv', [
+            'deployment-engine', 'deploy',
+            '--instances', example_instances,
+            '--desired', example_desired,
+            '--dry-run'
+        ]):
+            # Should not raise any exceptions for dry run
+            main()
+
+    def test_load_actual_example_instances(self, example_files):
         """Test loading the actual example instances file."""
-        example_instances = "examples/instances.json"
-
-        if os.path.exists(example_instances):
-            instances = load_instances(example_instances)
-            assert len(instances) > 0
-            assert all(isinstance(inst, InstanceState) for inst in instances)
-            assert all(inst.instance_id for inst in instances)  # All have IDs
-        else:
-            pytest.skip("Example instances file not found")
\ No newline at end of file
+        example_instances, _ = example_files
+        instances = load_instances(example_instances)
+        assert len(instances) > 0
+        assert all(isinstance(inst, InstanceState) for inst in instances)
+        assert all(inst.instance_id for inst in instances)  # All have IDs
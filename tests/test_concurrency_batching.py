@@ -1,5 +1,4 @@
 import asyncio
-import time
 import pytest
 from deployment_engine.models import InstanceState, SystemState, DeploymentConfig, Health
 from deployment_engine.engine import DeploymentEngine
@@ -10,19 +9,19 @@ class TestConcurrencyAndBatching:
     """Concurrency and batching behavior tests."""
 
     @pytest.mark.asyncio
-    async def test_batches_processed_sequentially(self):
+    async def test_batches_processed_sequentially(self, virtual_clock):
         instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(6)]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         cfg = DeploymentConfig(batch_size=2)
         engine = DeploymentEngine(FailureInjector(fail_attempts={}, delay=0.1))
 
-        start_time = time.time()
+        start_time = virtual_clock.time()
         res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
-        duration = time.time() - start_time
+        duration = virtual_clock.time() - start_time
 
-        # Should take at least 0.3 seconds (3 batches * 0.1s delay), but instances within batches run concurrently
-        assert duration >= 0.25  # Allow some margin for test timing
+        # 3 batches * 0.1s delay, instances within batches run concurrently
+        assert duration == pytest.approx(0.3)
         assert res.success is True
         assert len(res.history) >= 6  # batch_start/batch_end for 3 batches
 
@@ -39,23 +38,72 @@ class TestConcurrencyAndBatching:
         res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         assert res.success is False
         assert len(res.updated) == 2  # id1 and id3 should succeed
-        assert set(res.failed) == {"id0", "id2"}
+        assert sorted(res.failed) == ["id0", "id2"]
         assert instances[1].code_version == "newC"  # id1 succeeded
         assert instances[3].code_version == "newC"  # id3 succeeded
         assert instances[0].health == Health.FAILED
         assert instances[2].health == Health.FAILED
 
     @pytest.mark.asyncio
-    async def test_large_instances_small_batches(self):
-        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(20)]
+    async def test_large_instances_small_batches(self, plain_engine, make_instances):
+        instances = make_instances(20)
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         cfg = DeploymentConfig(batch_size=3)
-        engine = DeploymentEngine()
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await plain_engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         assert res.success is True
         assert len(res.updated) == 20
         # Should have 7 batches (3+3+3+3+3+3+2)
-        batch_events = [h for h in res.history if h["event"] == "batch_start"]
-        assert len(batch_events) == 7
\ No newline at end of file
+        assert res.history_counts["batch_start"] == 7
+
+    @pytest.mark.asyncio
+    async def test_overlapping_deploys_leave_task_factory_alone(self):
+        cfg = DeploymentConfig(batch_size=2)
+
+        def deploy(delay):
+            instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(4)]
+            current = SystemState(code_version="oldC", configuration_version="oldK")
+            engine = DeploymentEngine(FailureInjector(delay=delay))
+            return engine.deploy(instances=instances, desired=SystemState("newC", "newK"), current=current, config=cfg)
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(deploy(0.01), deploy(0.05))
+        assert all(res.success for res in results)
+        # Only the engine's own tasks start eagerly, the loop is never reconfigured
+        assert loop.get_task_factory() is None
+
+    @pytest.mark.asyncio
+    async def test_abort_skips_queued_instances(self, cfg_batch1_nofail):
+        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(4)]
+        desired = SystemState("newC", "newK")
+        current = SystemState(code_version="oldC", configuration_version="oldK")
+        engine = DeploymentEngine(FailureInjector(fail_attempts={"id0": 1}, delay=0.0))
+
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch1_nofail)
+        assert res.rolled_back is True
+        # Instances still waiting for a slot are never started once the limit is hit
+        assert list(res.per_node_history) == ["id0"]
+
+    @pytest.mark.asyncio
+    async def test_abort_cancels_in_flight_updates(self, virtual_clock):
+        class SlowEngine(DeploymentEngine):
+            async def _update_instance(self, instance, desired, config):
+                if instance.instance_id == "id0":
+                    await asyncio.sleep(0.01)
+                    return False, "boom"
+                await asyncio.sleep(5)  # would hold up the abort if not cancelled
+                return True, None
+
+        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(4)]
+        desired = SystemState("newC", "newK")
+        current = SystemState(code_version="oldC", configuration_version="oldK")
+        cfg = DeploymentConfig(batch_size=2, max_failures=0)
+
+        start_time = virtual_clock.time()
+        res = await SlowEngine().deploy(instances=instances, desired=desired, current=current, config=cfg)
+        duration = virtual_clock.time() - start_time
+
+        assert res.rolled_back is True
+        assert res.failed == ["id0"]
+        assert duration < 1.0
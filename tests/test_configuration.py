@@ -1,5 +1,4 @@
-import asyncio
-import time
+import dataclasses
 import pytest
 from deployment_engine.models import InstanceState, SystemState, DeploymentConfig, Health
 from deployment_engine.engine import DeploymentEngine
@@ -9,23 +8,29 @@ from deployment_engine.failure import FailureInjector
 class TestConfigurationEdgeCases:
     """Configuration and parameter edge cases tests."""
 
+    @pytest.mark.parametrize("max_failures, failure_percentage, fail_ids", [
+        # Exceeds max_failures (2 > 1) even though percentage is fine (20% < 50%)
+        (1, 50.0, ["id1", "id3"]),
+        # Exceeds percentage only (30% > 25%)
+        (None, 25.0, ["id1", "id3", "id5"]),
+    ])
     @pytest.mark.asyncio
-    async def test_both_max_failures_and_percentage_set(self):
-        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(10)]
+    async def test_failure_thresholds(self, make_instances, max_failures, failure_percentage, fail_ids):
+        instances = make_instances(10)
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
-        # Fail 2 instances - this exceeds max_failures but not percentage
-        fail_map = {"id1": 1, "id3": 1}
-        cfg = DeploymentConfig(batch_size=2, max_failures=1, failure_percentage=50.0, retry_max_attempts=0)
+        fail_map = dict.fromkeys(fail_ids, 1)
+        cfg = DeploymentConfig(batch_size=2, max_failures=max_failures,
+                               failure_percentage=failure_percentage, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
         res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         assert res.success is False
         assert res.rolled_back is True
-        # Should abort due to max_failures (2 > 1) even though percentage is fine (20% < 50%)
+        assert res.aborted_reason == "failure thresholds exceeded"
 
     @pytest.mark.asyncio
-    async def test_retry_with_different_backoff_delays(self):
+    async def test_retry_with_different_backoff_delays(self, virtual_clock):
         instances = [InstanceState("id0", "oldC", "oldK")]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
@@ -33,28 +38,32 @@ class TestConfigurationEdgeCases:
         engine = DeploymentEngine(FailureInjector(fail_attempts={"id0": 2}, delay=0.0))
         cfg = DeploymentConfig(batch_size=1, retry_max_attempts=2, retry_base_delay_s=0.1)
 
-        start_time = time.time()
+        start_time = virtual_clock.time()
         res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
-        duration = time.time() - start_time
+        duration = virtual_clock.time() - start_time
 
         assert res.success is True
-        # Should have exponential backoff: 0.1s + 0.2s = 0.3s minimum
-        assert duration >= 0.25
+        # Should have exponential backoff: 0.1s + 0.2s
+        assert duration == pytest.approx(0.3)
         assert instances[0].code_version == "newC"
         assert instances[0].health == Health.HEALTHY
 
     @pytest.mark.asyncio
-    async def test_all_instances_already_at_desired_state(self):
+    async def test_all_instances_already_at_desired_state(self, plain_engine):
         instances = [InstanceState(f"id{i}", "newC", "newK") for i in range(3)]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         cfg = DeploymentConfig(batch_size=2)
-        engine = DeploymentEngine()
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await plain_engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         assert res.success is True
         assert res.updated == []
         assert res.skipped == ["id0", "id1", "id2"]
         # Current state should still be updated
         assert current.code_version == "newC"
-        assert current.configuration_version == "newK"
\ No newline at end of file
+        assert current.configuration_version == "newK"
+
+    def test_config_is_immutable(self):
+        cfg = DeploymentConfig(batch_size=2)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            cfg.batch_size = 3
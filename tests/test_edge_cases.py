@@ -1,4 +1,3 @@
-import asyncio
 import pytest
 from deployment_engine.models import InstanceState, SystemState, DeploymentConfig, Health
 from deployment_engine.engine import DeploymentEngine
@@ -9,28 +8,26 @@ class TestEdgeCasesAndErrorHandling:
     """Edge cases and error handling tests."""
 
     @pytest.mark.asyncio
-    async def test_deploy_empty_instances(self):
+    async def test_deploy_empty_instances(self, plain_engine):
         instances = []
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         cfg = DeploymentConfig(batch_size=2)
-        engine = DeploymentEngine()
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await plain_engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         assert res.success is True
         assert res.updated == []
         assert res.failed == []
         assert res.skipped == []
 
     @pytest.mark.asyncio
-    async def test_batch_size_larger_than_instances(self):
+    async def test_batch_size_larger_than_instances(self, plain_engine):
         instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(3)]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         cfg = DeploymentConfig(batch_size=10)
-        engine = DeploymentEngine()
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await plain_engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         assert res.success is True
         assert len(res.updated) == 3
         for i in instances:
@@ -45,7 +42,7 @@ class TestEdgeCasesAndErrorHandling:
             DeploymentEngine.plan_batches(instances, -1)
 
     @pytest.mark.asyncio
-    async def test_timeout_functionality(self):
+    async def test_timeout_functionality(self, virtual_clock):
         instances = [InstanceState("id0", "oldC", "oldK")]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
@@ -59,16 +56,34 @@ class TestEdgeCasesAndErrorHandling:
         assert instances[0].health == Health.FAILED
 
     @pytest.mark.asyncio
-    async def test_percentage_failure_threshold(self):
-        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(10)]
+    async def test_unexpected_update_error_propagates(self):
+        class BrokenEngine(DeploymentEngine):
+            async def _update_instance(self, instance, desired, config):
+                raise RuntimeError("boom")
+
+        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(3)]
+        desired = SystemState("newC", "newK")
+        current = SystemState(code_version="oldC", configuration_version="oldK")
+        cfg = DeploymentConfig(batch_size=2)
+
+        # The original exception reaches the caller, not an ExceptionGroup
+        with pytest.raises(RuntimeError, match="boom"):
+            await BrokenEngine().deploy(instances=instances, desired=desired, current=current, config=cfg)
+        assert current.deployment_in_progress is False
+
+    @pytest.mark.asyncio
+    async def test_injector_error_fails_update(self):
+        class BrokenInjector(FailureInjector):
+            def delay_seconds(self):
+                raise RuntimeError("injector broke")
+
+        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(2)]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
-        # Fail 3 out of 10 (30%), with 25% threshold
-        fail_map = {"id1": 1, "id3": 1, "id5": 1}
-        cfg = DeploymentConfig(batch_size=2, failure_percentage=25.0, retry_max_attempts=0)
-        engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
+        cfg = DeploymentConfig(batch_size=2, retry_max_attempts=0)
+        engine = DeploymentEngine(BrokenInjector())
 
         res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         assert res.success is False
-        assert res.rolled_back is True
-        assert res.aborted_reason == "failure thresholds exceeded"
\ No newline at end of file
+        assert sorted(res.failed) == ["id0", "id1"]
+        assert res.per_node_history["id0"][0]["error"] == "injector broke"
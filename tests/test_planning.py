@@ -1,10 +1,12 @@
-import pytest
+from hypothesis import given, strategies as st
 from deployment_engine.models import InstanceState
 from deployment_engine.engine import DeploymentEngine
 
 
-def test_plan_respects_batch_size():
-    inst = [InstanceState(f"n{i}", "a", "b") for i in range(10)]
-    batches = DeploymentEngine.plan_batches(inst, batch_size=3)
-    lengths = [len(b) for b in batches]
-    assert lengths == [3, 3, 3, 1]
+@given(n=st.integers(0, 200), b=st.integers(1, 50))
+def test_plan_respects_batch_size(n, b):
+    inst = [InstanceState(f"n{i}", "a", "b") for i in range(n)]
+    batches = DeploymentEngine.plan_batches(inst, batch_size=b)
+    assert [i for batch in batches for i in batch] == inst
+    assert all(len(batch) == b for batch in batches[:-1])
+    assert all(0 < len(batch) <= b for batch in batches)
@@ -1,4 +1,3 @@
-import asyncio
 import pytest
 from deployment_engine.models import InstanceState, SystemState, DeploymentConfig, Health
 from deployment_engine.engine import DeploymentEngine
@@ -9,16 +8,15 @@ class TestRollbackScenarios:
     """Rollback functionality tests."""
 
     @pytest.mark.asyncio
-    async def test_rollback_with_partial_batch_completion(self):
-        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(6)]
+    async def test_rollback_with_partial_batch_completion(self, cfg_batch2_max1, make_instances):
+        instances = make_instances(6)
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         # First batch succeeds, second batch has failures that trigger rollback
         fail_map = {"id2": 1, "id3": 1}
-        cfg = DeploymentConfig(batch_size=2, max_failures=1, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch2_max1)
         assert res.success is False
         assert res.rolled_back is True
         # All instances should be rolled back to original state
@@ -27,7 +25,7 @@ class TestRollbackScenarios:
             assert i.configuration_version == "oldK"
 
     @pytest.mark.asyncio
-    async def test_rollback_restores_health_states(self):
+    async def test_rollback_restores_health_states(self, cfg_batch2_nofail):
         instances = [
             InstanceState("id0", "oldC", "oldK", Health.HEALTHY),
             InstanceState("id1", "oldC", "oldK", Health.DEGRADED),
@@ -37,10 +35,9 @@ class TestRollbackScenarios:
         current = SystemState(code_version="oldC", configuration_version="oldK")
         # Fail after first batch to trigger rollback
         fail_map = {"id2": 1}
-        cfg = DeploymentConfig(batch_size=2, max_failures=0, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch2_nofail)
         assert res.success is False
         assert res.rolled_back is True
         # Health states should be restored
@@ -49,7 +46,7 @@ class TestRollbackScenarios:
         assert instances[2].health == Health.FAILED
 
     @pytest.mark.asyncio
-    async def test_rollback_with_already_desired_state_instances(self):
+    async def test_rollback_with_already_desired_state_instances(self, cfg_batch2_nofail):
         instances = [
             InstanceState("id0", "oldC", "oldK"),  # needs update
             InstanceState("id1", "newC", "newK"),  # already at desired
@@ -58,14 +55,44 @@ class TestRollbackScenarios:
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         fail_map = {"id2": 1}
-        cfg = DeploymentConfig(batch_size=2, max_failures=0, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch2_nofail)
         assert res.success is False
         assert res.rolled_back is True
         assert res.skipped == ["id1"]
         # All instances should maintain/restore their original state
         assert instances[0].code_version == "oldC"
         assert instances[1].code_version == "newC"  # was already at desired
-        assert instances[2].code_version == "oldC"
\ No newline at end of file
+        assert instances[2].code_version == "oldC"
+
+    @pytest.mark.asyncio
+    async def test_manual_rollback_from_snapshot_file_format(self):
+        instances = [InstanceState("id0", "newC", "newK", Health.HEALTHY)]
+        # Older snapshot files written by the CLI store each instance as a dict
+        snapshot = {
+            "id0": {"instance_id": "id0", "code_version": "oldC",
+                    "configuration_version": "oldK", "health": "degraded"}
+        }
+        engine = DeploymentEngine()
+
+        await engine.rollback(instances, snapshot)
+        assert instances[0].code_version == "oldC"
+        assert instances[0].configuration_version == "oldK"
+        assert instances[0].health == Health.DEGRADED
+
+    @pytest.mark.asyncio
+    async def test_abort_rolls_back_to_supplied_snapshot(self, cfg_batch2_nofail):
+        instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(2)]
+        desired = SystemState("newC", "newK")
+        current = SystemState(code_version="oldC", configuration_version="oldK")
+        snapshot = DeploymentEngine.take_snapshot(instances)
+        # Later changes to the instances must not leak into the rollback
+        instances[0].health = Health.DEGRADED
+        engine = DeploymentEngine(FailureInjector(fail_attempts={"id1": 1}, delay=0.0))
+
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch2_nofail,
+                                  snapshot=snapshot)
+        assert res.rolled_back is True
+        assert instances[0].code_version == "oldC"
+        assert instances[0].health == Health.HEALTHY
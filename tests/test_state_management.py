@@ -1,4 +1,3 @@
-import asyncio
 import pytest
 from deployment_engine.models import InstanceState, SystemState, DeploymentConfig, Health
 from deployment_engine.engine import DeploymentEngine
@@ -9,64 +8,60 @@ class TestStateManagement:
     """State management and tracking tests."""
 
     @pytest.mark.asyncio
-    async def test_deployment_in_progress_flag_management(self):
+    async def test_deployment_in_progress_flag_management(self, plain_engine):
         instances = [InstanceState("id0", "oldC", "oldK")]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         cfg = DeploymentConfig(batch_size=1)
-        engine = DeploymentEngine()
 
         assert current.deployment_in_progress is False
-        await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        await plain_engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
         # Flag should be reset after deployment
         assert current.deployment_in_progress is False
 
     @pytest.mark.asyncio
-    async def test_deployment_in_progress_flag_reset_on_failure(self):
+    async def test_deployment_in_progress_flag_reset_on_failure(self, cfg_batch1_nofail):
         instances = [InstanceState("id0", "oldC", "oldK")]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         fail_map = {"id0": 1}
-        cfg = DeploymentConfig(batch_size=1, max_failures=0, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
         assert current.deployment_in_progress is False
-        await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch1_nofail)
         # Flag should be reset even after failed deployment
         assert current.deployment_in_progress is False
 
     @pytest.mark.asyncio
-    async def test_current_state_not_updated_on_failure(self):
+    async def test_current_state_not_updated_on_failure(self, cfg_batch1_nofail):
         instances = [InstanceState("id0", "oldC", "oldK")]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         fail_map = {"id0": 1}
-        cfg = DeploymentConfig(batch_size=1, max_failures=0, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch1_nofail)
         assert res.success is False
         # Current state should remain unchanged
         assert current.code_version == "oldC"
         assert current.configuration_version == "oldK"
 
     @pytest.mark.asyncio
-    async def test_history_tracking_complex_scenario(self):
+    async def test_history_tracking_complex_scenario(self, cfg_batch2_nofail):
         instances = [InstanceState(f"id{i}", "oldC", "oldK") for i in range(5)]
         desired = SystemState("newC", "newK")
         current = SystemState(code_version="oldC", configuration_version="oldK")
         # Fail in second batch to trigger rollback
         fail_map = {"id2": 1}
-        cfg = DeploymentConfig(batch_size=2, max_failures=0, retry_max_attempts=0)
         engine = DeploymentEngine(FailureInjector(fail_attempts=fail_map, delay=0.0))
 
-        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg)
+        res = await engine.deploy(instances=instances, desired=desired, current=current, config=cfg_batch2_nofail)
 
         # Check global history
         assert len(res.history) >= 4  # batch_start, batch_end, batch_start, abort
-        abort_events = [h for h in res.history if h["event"] == "abort"]
-        assert len(abort_events) == 1
-        assert abort_events[0]["reason"] == "failure thresholds exceeded"
+        assert res.history_counts["abort"] == 1
+        assert res.history[-1]["event"] == "abort"
+        assert res.history[-1]["reason"] == "failure thresholds exceeded"
 
         # Check per-node history
         assert "id0" in res.per_node_history